@@ -1,305 +1,813 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 import time
 import random
+import re
 import os
-import json
-from playwright.sync_api import sync_playwright
+import logging
+import hashlib
+import orjson
+import threading
+from urllib.parse import urlparse, urlsplit, urlunsplit, urljoin
+from concurrent.futures import ThreadPoolExecutor
+from playwright.sync_api import sync_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 
 # --- Configuration ---
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(message)s",
+)
+logger = logging.getLogger("scraper")
+
 DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL")
 if not DISCORD_WEBHOOK_URL:
-    print("Warning: DISCORD_WEBHOOK_URL environment variable not set. Deals will not be sent to Discord.")
+    logger.warning("DISCORD_WEBHOOK_URL environment variable not set. Deals will not be sent to Discord.")
 
 # Define the path for the file that stores sent deals.
 # This path should ideally be within a persistent volume on Railway.
 SENT_DEALS_FILE = "/app/data/sent_deals.json"
 
+# How long a sent deal is remembered after it was last seen listed; each run that still finds
+# the deal refreshes its timestamp, so only deals that have dropped off the site expire.
+SENT_DEALS_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Chromium profile kept next to the sent deals store so cookies (including Cloudflare clearance)
+# and site state survive between runs. It is not a page cache: request interception below turns
+# off Chromium's HTTP cache, so conditional requests are made for the RSS feed instead.
+BROWSER_PROFILE_DIR = "/app/data/browser_profile"
+
+# Browser identity used for every Playwright context.
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+VIEWPORT = {"width": 1920, "height": 1080}
+
+# --- Shared HTTP session ---
+# A single pooled session keeps the TLS connection to Discord alive between posts
+# instead of doing a fresh handshake for every deal.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=20,
+    # Only failures to connect are retried here: the request never reached the server, so
+    # resending cannot post a message twice. Webhook POSTs are not idempotent, so read errors
+    # and status codes (429 and 5xx alike) are never retried by the adapter; send_to_discord
+    # handles those itself, pacing through DISCORD_RATE_LIMITER and Discord's rate-limit headers.
+    max_retries=Retry(
+        total=3,
+        connect=3,
+        read=0,
+        other=0,
+        status=0,
+        backoff_factor=0.5,
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    ),
+))
+
+# The RSS feed GET is idempotent, so unlike webhook posts it is retried on read errors and
+# transient 5xx answers too. requests picks the adapter with the longest matching prefix, so
+# this one wins over the generic https:// adapter for the site. Retry-After is not honoured
+# (urllib3 would sleep for as long as it asks); a 429 is not retried either and sends the run
+# to the Playwright fallback instead.
+SESSION.mount("https://www.hotukdeals.com/", HTTPAdapter(max_retries=Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=frozenset({"GET"}),
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)))
+
 # --- Helper functions for managing sent deals ---
-def load_sent_deals(file_path):
-    """Loads previously sent deal links from a JSON file."""
+# Query parameters that only track where a click came from; they never identify a different deal.
+# utm_* is a whole family; the others are matched by exact name, so e.g. "tags" or "reference" stay.
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = frozenset({"ref", "tag", "fbclid", "gclid", "_encoding"})
+
+def is_tracking_param(param):
+    """True if a "name=value" query parameter is only click tracking."""
+    name = param.partition("=")[0]
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+def canonical_link(link):
+    """Strips tracking parameters, fragments and trailing slashes so the same deal always maps to one URL."""
+    parts = urlsplit(link.strip())
+    query = "&".join(
+        param for param in parts.query.split("&")
+        if param and not is_tracking_param(param)
+    )
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+def deal_key(link):
+    """Returns the compact key a deal is remembered by: a short blake2b digest of its canonical link."""
+    return hashlib.blake2b(canonical_link(link).encode("utf-8"), digest_size=12).hexdigest()
+
+def load_sent_deals(file_path, ttl=SENT_DEALS_TTL_SECONDS):
+    """Loads previously sent deal keys (key -> sent timestamp) from a JSON file, dropping expired ones."""
     if not os.path.exists(file_path):
-        print(f"No existing sent deals file found at {file_path}. Starting fresh.")
-        return set() # Use a set for efficient lookup
+        logger.info("No existing sent deals file found at %s. Starting fresh.", file_path)
+        return {} # Use a dict for efficient lookup
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            # Load as list, convert to set for lookup efficiency
-            sent_deals = set(json.load(f))
-            print(f"Loaded {len(sent_deals)} previously sent deals.")
-            return sent_deals
-    except (json.JSONDecodeError, FileNotFoundError, IOError) as e:
-        print(f"Error loading sent deals from {file_path}: {e}. Starting fresh.")
-        return set()
+        with open(file_path, 'rb') as f:
+            data = orjson.loads(f.read())
+    except (orjson.JSONDecodeError, FileNotFoundError, IOError) as e:
+        logger.error("Error loading sent deals from %s: %s. Starting fresh.", file_path, e)
+        return {}
+
+    now = time.time()
+    # Older files stored a plain list of links; treat those as sent just now.
+    if isinstance(data, list) and all(isinstance(link, str) for link in data):
+        data = dict.fromkeys(data, now)
+    # Valid JSON of any other shape (or non-numeric timestamps) would break the lookups below.
+    if not (isinstance(data, dict) and all(isinstance(sent_at, (int, float)) for sent_at in data.values())):
+        logger.error("Unexpected data in %s. Starting fresh.", file_path)
+        return {}
+
+    cutoff = now - ttl
+    sent_deals = {}
+    expired = 0
+    for key, sent_at in data.items():
+        if sent_at < cutoff:
+            expired += 1
+            continue
+        # Entries written before keys were hashed are stored under the raw link.
+        if "/" in key:
+            key = deal_key(key)
+        # Links that differ only in tracking parameters now share a key; keep the latest timestamp.
+        sent_deals[key] = max(sent_at, sent_deals.get(key, 0))
+    logger.info("Loaded %d previously sent deals (%d expired).", len(sent_deals), expired)
+    return sent_deals
+
+def write_file_atomically(file_path, data):
+    """Writes bytes to a sibling file and swaps it in, so a crash mid-write never leaves a truncated file."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
 
 def save_sent_deals(file_path, sent_deals):
-    """Saves the current list of sent deal links to a JSON file."""
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    """Saves the current mapping of sent deal keys to a JSON file."""
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            # Convert set back to list for JSON serialization
-            json.dump(list(sent_deals), f, indent=4)
-            print(f"Saved {len(sent_deals)} sent deals to {file_path}.")
+        write_file_atomically(file_path, orjson.dumps(sent_deals))
+        logger.info("Saved %d sent deals to %s.", len(sent_deals), file_path)
     except IOError as e:
-        print(f"Error saving sent deals to {file_path}: {e}")
+        logger.error("Error saving sent deals to %s: %s", file_path, e)
 
-# --- Helper function to send to Discord ---
-def send_to_discord(deal_info, source_name="Deal Bot"):
-    """Sends deal information to a Discord webhook, with rate limit handling."""
-    if not DISCORD_WEBHOOK_URL:
-        return
+# --- Helper functions to send to Discord ---
+# Discord accepts up to 10 embeds in a single webhook message.
+MAX_EMBEDS_PER_MESSAGE = 10
+
+# Discord rejects the whole message if any embed exceeds its limits, so long text is cut to fit.
+EMBED_TITLE_LIMIT = 256
+EMBED_FIELD_VALUE_LIMIT = 1024
+
+# Webhooks allow roughly 30 messages a minute with small bursts; pace sends to that.
+DISCORD_BURST = 5
+DISCORD_MESSAGES_PER_SECOND = 0.5
+
+# Payloads are pre-serialized with orjson, so the content type is set explicitly.
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Attempts per message when Discord answers 429 or a transient server error.
+MAX_DISCORD_ATTEMPTS = 3
+DISCORD_RETRY_STATUSES = (500, 502, 503, 504)
+
+# Longest wait between retries, whatever the attempt number or the server asks for.
+MAX_BACKOFF_SECONDS = 60
+
+DEFAULT_EMBED_COLOR = 0x808080
+
+# Per-source webhook identity and embed colour, so nothing is formatted per message.
+SOURCE_META = {
+    "HotUKDeals": {
+        "color": 0xFFA500, # Orange for HUKD
+        "username": "HotUKDeals Deal Bot",
+        "avatar_url": "https://www.hotukdeals.com/favicon.ico",
+    },
+}
+
+def source_meta(source_name):
+    """Returns the webhook/embed settings for a source, falling back to generic ones."""
+    meta = SOURCE_META.get(source_name)
+    if meta is None:
+        meta = {"color": DEFAULT_EMBED_COLOR, "username": f"{source_name} Deal Bot"}
+    return meta
+
+class TokenBucket:
+    """Thread-safe token bucket: allows bursts of `capacity` and refills at `rate` tokens per second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Takes a token, sleeping only as long as needed for one to become available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+DISCORD_RATE_LIMITER = TokenBucket(DISCORD_BURST, DISCORD_MESSAGES_PER_SECOND)
+
+def build_embed(deal_info, source_name="Deal Bot"):
+    """Builds the Discord embed for a single scraped deal (title, link, price, image_url and metric_info keys)."""
+    fields = [
+        {"name": "Price", "value": deal_info["price"][:EMBED_FIELD_VALUE_LIMIT], "inline": True},
+        {"name": "Source", "value": source_name, "inline": True},
+    ]
+    if deal_info["metric_info"]:
+        fields.append({"name": "Popularity", "value": deal_info["metric_info"][:EMBED_FIELD_VALUE_LIMIT], "inline": True})
 
     embed = {
-        "title": deal_info["title"],
+        "title": deal_info["title"][:EMBED_TITLE_LIMIT],
         "url": deal_info["link"],
-        "color": 0xFFA500, # Orange for HUKD
-        "fields": [
-            {"name": "Price", "value": deal_info["price"], "inline": True},
-            {"name": "Source", "value": source_name, "inline": True},
-        ],
-        "thumbnail": {"url": deal_info.get("image_url", "")}
+        "color": source_meta(source_name)["color"],
+        "fields": fields,
     }
-    
-    if deal_info.get("discount_info") and deal_info["discount_info"] != "N/A":
-        embed["fields"].append({"name": "Discount Info", "value": deal_info["discount_info"], "inline": False})
-    
-    if deal_info.get("metric_info"):
-        embed["fields"].append({"name": "Popularity", "value": deal_info["metric_info"], "inline": True})
-
+    if deal_info["image_url"]:
+        embed["thumbnail"] = {"url": deal_info["image_url"]}
+    return embed
+
+def discord_retry_delay(response):
+    """Returns the seconds Discord asks us to wait, from Retry-After or X-RateLimit-Reset-After."""
+    for header in ("Retry-After", "X-RateLimit-Reset-After"):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    return 1.0
+
+def backoff_delay(attempt, retry_after=None):
+    """Returns the wait before the next attempt: the server's Retry-After if usable, else exponential backoff with jitter."""
+    if retry_after:
+        try:
+            return min(MAX_BACKOFF_SECONDS, float(retry_after))
+        except ValueError:
+            pass # HTTP-date form; fall back to backoff
+    return min(MAX_BACKOFF_SECONDS, 2 ** attempt + random.random())
+
+def send_to_discord(embeds, source_name="Deal Bot"):
+    """
+    Sends up to MAX_EMBEDS_PER_MESSAGE deal embeds to a Discord webhook in one message, with rate limit handling.
+    Returns the HTTP status of Discord's answer, or None if nothing was sent or no answer came back.
+    """
+    if not DISCORD_WEBHOOK_URL or not embeds:
+        return None
 
+    meta = source_meta(source_name)
     payload = {
-        "username": f"{source_name} Deal Bot",
-        "avatar_url": "https://www.hotukdeals.com/favicon.ico",
-        "embeds": [embed]
+        "username": meta["username"],
+        "embeds": embeds[:MAX_EMBEDS_PER_MESSAGE]
     }
+    if "avatar_url" in meta:
+        payload["avatar_url"] = meta["avatar_url"]
 
+    body = orjson.dumps(payload) # Encoded once, reused for any retries
     try:
-        response = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
-        
-        if response.status_code == 429:
-            retry_after = int(response.headers.get("Retry-After", 1)) / 1000 # Retry-After is in milliseconds
-            print(f"Discord rate limited. Retrying after {retry_after:.2f} seconds...")
-            time.sleep(retry_after + 0.1) 
-            response = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10) 
+        for attempt in range(1, MAX_DISCORD_ATTEMPTS + 1):
+            DISCORD_RATE_LIMITER.acquire()
+            response = SESSION.post(DISCORD_WEBHOOK_URL, data=body, headers=JSON_HEADERS, timeout=10)
+            if attempt == MAX_DISCORD_ATTEMPTS:
+                break
+            if response.status_code == 429:
+                retry_after = discord_retry_delay(response) # Seconds, not milliseconds
+                logger.warning("Discord rate limited. Retrying after %.2f seconds...", retry_after)
+            elif response.status_code in DISCORD_RETRY_STATUSES:
+                retry_after = backoff_delay(attempt)
+                logger.warning("Discord answered %d. Retrying after %.2f seconds...", response.status_code, retry_after)
+            else:
+                break
+            time.sleep(retry_after)
 
         response.raise_for_status()
-        print(f"Successfully sent deal to Discord: {deal_info['title']} (Source: {source_name})")
+        status = response.status_code
+        logger.info("Successfully sent %d deal(s) to Discord (Source: %s)", len(payload["embeds"]), source_name)
+
+        # The bucket is drained: wait out its reset so the next message is not rejected.
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            time.sleep(discord_retry_delay(response))
     except requests.exceptions.RequestException as e:
-        print(f"Error sending to Discord webhook from {source_name}: {e}")
-    
-    time.sleep(1)
+        logger.error("Error sending to Discord webhook from %s: %s", source_name, e)
+        # An HTTP error still carries Discord's answer; a connection failure has none.
+        status = e.response.status_code if e.response is not None else None
+    return status
 
-# --- Helper function to try multiple selectors ---
-def find_element_with_multiple_selectors(soup_or_element, selector_list):
+class DiscordBatcher:
     """
-    Tries to find an element using a list of CSS selectors.
-    Returns the first found element or None.
+    Buffers deal embeds and sends them to Discord in messages of up to MAX_EMBEDS_PER_MESSAGE.
+    Keys of the deals Discord accepted are collected in `sent` (key -> sent timestamp).
     """
-    for selector in selector_list:
-        found_element = soup_or_element.select_one(selector)
-        if found_element:
-            return found_element
-    return None
 
-def find_text_with_multiple_selectors(soup_or_element, selector_list, attribute=None):
+    def __init__(self, source_name="Deal Bot", size=MAX_EMBEDS_PER_MESSAGE):
+        self.source_name = source_name
+        self.size = min(size, MAX_EMBEDS_PER_MESSAGE)
+        self.buffer = [] # (deal key, embed) pairs
+        self.sent = {}
+
+    def add(self, deal_info, key):
+        """Queues a deal under its dedupe key, sending a message as soon as a full batch is buffered."""
+        self.buffer.append((key, build_embed(deal_info, self.source_name)))
+        if len(self.buffer) >= self.size:
+            self.flush()
+
+    def flush(self):
+        """Sends whatever is buffered, recording the key of every deal Discord accepted."""
+        while self.buffer:
+            batch, self.buffer = self.buffer[:self.size], self.buffer[self.size:]
+            status = send_to_discord([embed for _, embed in batch], self.source_name)
+            if len(batch) > 1 and status is not None and 400 <= status < 500 and status != 429:
+                # Discord refuses the whole message if any one embed is invalid. Resend the embeds
+                # one at a time so only the bad deal is dropped, not its whole batch on every run.
+                logger.warning("Discord rejected a batch of %d embeds (HTTP %d); resending them one by one.", len(batch), status)
+                results = [(key, send_to_discord([embed], self.source_name)) for key, embed in batch]
+            else:
+                results = [(key, status) for key, _ in batch]
+            sent_at = time.time()
+            for key, status in results:
+                if status is not None and status < 400:
+                    self.sent[key] = sent_at
+
+def log_task_failure(future):
+    """Done-callback for background Discord tasks: logs their exception instead of letting it vanish."""
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Discord task failed: %s", exc, exc_info=exc)
+
+# --- Define lists of potential selectors ---
+# Immutable and ordered most-likely first: the first selector that matches wins, so the
+# site's current markup should stay at the front of each tuple.
+MAIN_DEAL_CONTAINER_SELECTORS = (
+    'article.thread--card',                  # Original
+    'div.thread--card',                      # Common: div instead of article
+    'div[class*="deal-item"]',               # Generic "deal-item" in class
+    'section[class*="product-card"]',        # Generic "product-card" in class
+    'div[data-thread-id]',                   # If they use data attributes for threads
+    'article[id*="thread"]',                 # If thread is in ID
+    'div.x-threadCard',                      # Example of potential new, arbitrary class name
+    'div.offer-card',                        # Another common naming convention
+)
+
+TITLE_SELECTORS = (
+    '.cept-deal-title',                      # Original
+    '.deal-title-link',                      # Common alternative
+    'h2.thread-title a',                     # Title inside H2, linked
+    'h3.deal-item__title a',                 # Title inside H3
+    'a[class*="title"]',                     # Link with "title" in class
+)
+
+PRICE_SELECTORS = (
+    '.thread-price',                         # Original
+    '.deal-price',                           # Common alternative
+    '.price-text',                           # Another common naming
+    'span[class*="price"]',                  # Span with "price" in class
+    '.current-price',                        # If they differentiate current/old price
+    'div[class*="price"]',                   # Try a div for price
+    '[itemprop="price"]',                    # Microdata price
+    '.price',                                # Very generic price class
+)
+
+HEAT_SELECTORS = (
+    '.cept-vote-temp',                       # Original
+    '.vote-temp',                            # Common alternative
+    '.deal-heat',                            # Another common naming
+    'span[class*="heat-count"]',             # Span with "heat-count" in class
+    '.vote-score',                           # Generic score
+)
+
+IMAGE_SELECTORS = (
+    '.thread-image',                         # Original
+    '.deal-image img',                       # Common structure: img inside a container
+    'img[class*="product-image"]',           # Image with "product-image" in class
+    'img[class*="deal-thumbnail"]',          # Image with "deal-thumbnail" in class
+)
+
+# Any deal card at all; used by Playwright to wait for the listing to render.
+MAIN_DEAL_CONTAINER_UNION = ', '.join(MAIN_DEAL_CONTAINER_SELECTORS)
+
+# Lazy-loaded images keep the real URL out of src (or leave a data: placeholder there);
+# srcset is read up to its first URL. Images are never downloaded, only linked.
+IMAGE_ATTRIBUTES = ("src", "data-src", "data-original", "srcset")
+
+# Fields pulled from each deal card: (name, backup selectors, attribute(s) or None for text).
+DEAL_FIELDS = (
+    ("title", TITLE_SELECTORS, None),
+    ("link", TITLE_SELECTORS, "href"),
+    ("price", PRICE_SELECTORS, None),
+    ("heat", HEAT_SELECTORS, None),
+    ("image_url", IMAGE_SELECTORS, IMAGE_ATTRIBUTES),
+)
+
+# Price/heat containers often carry extra text (old price, "°", whitespace); keep just the value.
+PRICE_RE = re.compile(r"£\s?\d[\d,]*(?:\.\d{1,2})?")
+HEAT_RE = re.compile(r"-?\d[\d,]*")
+# --- End selector lists ---
+
+def first_match(pattern, text):
+    """Returns the first match of a precompiled pattern in text, or the text unchanged if there is none."""
+    match = pattern.search(text)
+    return match.group(0) if match else text
+
+# --- Playwright helpers ---
+# Navigation is retried on network errors/timeouts and on throttling answers.
+NAVIGATION_ATTEMPTS = 3
+RETRYABLE_PAGE_STATUSES = (429, 503)
+
+# Requests the scraper never reads. Stylesheets are kept: layout drives lazy-loading
+# and the visibility checks used for pagination.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+BLOCKED_HOST_KEYWORDS = (
+    "doubleclick", "googlesyndication", "googletagmanager", "google-analytics",
+    "adservice", "facebook.net", "hotjar", "criteo", "taboola", "outbrain",
+)
+
+def block_unneeded_requests(route):
+    """Aborts images, media, fonts and ad/analytics requests; lets everything else through."""
+    request = route.request
+    host = urlparse(request.url).netloc
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(keyword in host for keyword in BLOCKED_HOST_KEYWORDS):
+        route.abort()
+    else:
+        route.continue_()
+
+def goto_with_retry(page, url, attempts=NAVIGATION_ATTEMPTS, **goto_kwargs):
+    """Navigates the page to url, retrying with backoff on Playwright errors and 429/503 responses."""
+    for attempt in range(1, attempts + 1):
+        try:
+            response = page.goto(url, **goto_kwargs)
+        except PlaywrightError as e:
+            if attempt == attempts:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("Navigation to %s failed (%s). Retrying in %.1f seconds...", url, e, delay)
+        else:
+            if response is None or response.status not in RETRYABLE_PAGE_STATUSES or attempt == attempts:
+                return response
+            delay = backoff_delay(attempt, response.headers.get("retry-after"))
+            logger.warning("%s answered %d. Retrying in %.1f seconds...", url, response.status, delay)
+        time.sleep(delay)
+
+# Runs in the page: takes the cards matched by the first container selector that hits and
+# reads every DEAL_FIELDS entry from each, trying its backup selectors in priority order.
+# Missing fields come back as "".
+EXTRACT_DEALS_JS = """([containerSelectors, fields]) => {
+    const firstMatch = (card, selectors) => {
+        for (const selector of selectors) {
+            const element = card.querySelector(selector);
+            if (element) return element;
+        }
+        return null;
+    };
+    const readValue = (element, attribute) => {
+        if (!attribute) return element.textContent;
+        if (typeof attribute === "string") return element.getAttribute(attribute);
+        for (const name of attribute) {
+            const value = (element.getAttribute(name) || "").trim();
+            if (value && !value.startsWith("data:")) return name === "srcset" ? value.split(",")[0].trim().split(/\s+/)[0] : value;
+        }
+        return "";
+    };
+    for (const selector of containerSelectors) {
+        const cards = document.querySelectorAll(selector);
+        if (!cards.length) continue;
+        return Array.from(cards, card => {
+            const deal = {};
+            for (const [name, selectors, attribute] of fields) {
+                const element = firstMatch(card, selectors);
+                const value = element ? readValue(element, attribute) : "";
+                deal[name] = (value || "").trim();
+            }
+            return deal;
+        });
+    }
+    return [];
+}"""
+
+def extract_deal_cards(page):
     """
-    Tries to find text or an attribute from an element using a list of CSS selectors.
-    Returns the text/attribute or "N/A".
+    Extracts the fields of every deal card directly from the live DOM in one round-trip.
+    Nothing is serialized back as HTML or re-parsed in Python.
     """
-    element = find_element_with_multiple_selectors(soup_or_element, selector_list)
-    if element:
-        if attribute:
-            return element.get(attribute, "N/A").strip()
-        return element.text.strip()
-    return "N/A"
+    return page.evaluate(EXTRACT_DEALS_JS, [MAIN_DEAL_CONTAINER_SELECTORS, DEAL_FIELDS])
 
-# --- Scraper for HotUKDeals.com with basic Playwright and backup selectors ---
-def scrape_hotukdeals(max_pages=1):
-    """Scrapes hotukdeals.com for popular deals using basic Playwright with backup selectors and scrolling."""
-    base_url = "https://www.hotukdeals.com/"
-    
-    new_deals_sent = []
-    
-    # --- Deduplication: Load previously sent deals ---
-    sent_deal_links = load_sent_deals(SENT_DEALS_FILE)
-
-    # --- Define lists of potential selectors ---
-    MAIN_DEAL_CONTAINER_SELECTORS = [
-        'article.thread--card',                  # Original
-        'div.thread--card',                      # Common: div instead of article
-        'div[class*="deal-item"]',               # Generic "deal-item" in class
-        'section[class*="product-card"]',        # Generic "product-card" in class
-        'div[data-thread-id]',                   # If they use data attributes for threads
-        'article[id*="thread"]',                 # If thread is in ID
-        'div.x-threadCard',                      # Example of potential new, arbitrary class name
-        'div.offer-card',                        # Another common naming convention
-    ]
+SCROLL_ATTEMPTS_PER_PAGE = 3
+SCROLL_GROWTH_TIMEOUT_MS = 4000
+CARD_COUNT_JS = "selector => document.querySelectorAll(selector).length"
+CARDS_GREW_JS = "([selector, previous]) => document.querySelectorAll(selector).length > previous"
 
-    TITLE_SELECTORS = [
-        '.cept-deal-title',                      # Original
-        '.deal-title-link',                      # Common alternative
-        'h2.thread-title a',                     # Title inside H2, linked
-        'h3.deal-item__title a',                 # Title inside H3
-        'a[class*="title"]',                     # Link with "title" in class
-    ]
+def scroll_until_stable(page):
+    """
+    Scrolls to the bottom until no new deal cards appear within SCROLL_GROWTH_TIMEOUT_MS,
+    up to SCROLL_ATTEMPTS_PER_PAGE times. Returns the final card count.
+    """
+    count = page.evaluate(CARD_COUNT_JS, MAIN_DEAL_CONTAINER_UNION)
+    for i in range(SCROLL_ATTEMPTS_PER_PAGE):
+        logger.debug("  Scrolling attempt %d of %d (%d cards so far)...", i + 1, SCROLL_ATTEMPTS_PER_PAGE, count)
+        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        try:
+            page.wait_for_function(CARDS_GREW_JS, arg=[MAIN_DEAL_CONTAINER_UNION, count], timeout=SCROLL_GROWTH_TIMEOUT_MS)
+        except PlaywrightTimeoutError:
+            logger.debug("  No new cards after scrolling; stopping.")
+            break
+        count = page.evaluate(CARD_COUNT_JS, MAIN_DEAL_CONTAINER_UNION)
+    return count
+
+# --- HotUKDeals RSS feed (fast path) ---
+HOTUKDEALS_URL = "https://www.hotukdeals.com/"
+HOTUKDEALS_FEED_URL = "https://www.hotukdeals.com/rss/hot"
+
+# Pepper-platform feeds carry price/merchant and images in extra namespaces; match by local name.
+FEED_ITEMS = etree.XPath("//item")
+FEED_PRICE = etree.XPath("string(*[local-name()='merchant']/@price)")
+FEED_IMAGE = etree.XPath("string((*[local-name()='content' or local-name()='thumbnail']/@url | enclosure/@url)[1])")
+
+# Last full feed download and its ETag/Last-Modified, so the next run can revalidate it.
+FEED_CACHE_FILE = "/app/data/hot_feed.xml"
+FEED_VALIDATORS_FILE = "/app/data/hot_feed.json"
+
+def load_feed_cache():
+    """Returns (conditional request headers, cached feed body) from the last full download, or ({}, None)."""
+    try:
+        with open(FEED_VALIDATORS_FILE, 'rb') as f:
+            validators = orjson.loads(f.read())
+        with open(FEED_CACHE_FILE, 'rb') as f:
+            body = f.read()
+    except (orjson.JSONDecodeError, IOError):
+        return {}, None
+    if not (isinstance(validators, dict) and all(isinstance(value, str) for value in validators.values())):
+        return {}, None
+    return validators, body
+
+def save_feed_cache(response):
+    """Stores the feed body with its validators; does nothing if the server sent neither ETag nor Last-Modified."""
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["If-None-Match"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["If-Modified-Since"] = response.headers["Last-Modified"]
+    if not validators:
+        return
+    # Body first: if the run dies in between, the old validators can only ever revalidate
+    # against an older copy, which the server then answers in full.
+    try:
+        write_file_atomically(FEED_CACHE_FILE, response.content)
+        write_file_atomically(FEED_VALIDATORS_FILE, orjson.dumps(validators))
+    except IOError as e:
+        logger.warning("Could not cache the HotUKDeals RSS feed: %s", e)
 
-    PRICE_SELECTORS = [
-        '.thread-price',                         # Original
-        '.deal-price',                           # Common alternative
-        '.price-text',                           # Another common naming
-        'span[class*="price"]',                  # Span with "price" in class
-        '.current-price',                        # If they differentiate current/old price
-        'div[class*="price"]',                   # Try a div for price
-        '[itemprop="price"]',                    # Microdata price
-        '.price',                                # Very generic price class
-    ]
+def clear_feed_cache():
+    """Deletes the cached feed and its validators, so the next run downloads the feed in full."""
+    for file_path in (FEED_VALIDATORS_FILE, FEED_CACHE_FILE):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
 
-    HEAT_SELECTORS = [
-        '.cept-vote-temp',                       # Original
-        '.vote-temp',                            # Common alternative
-        '.deal-heat',                            # Another common naming
-        'span[class*="heat-count"]',             # Span with "heat-count" in class
-        '.vote-score',                           # Generic score
+def fetch_hotukdeals_feed():
+    """
+    Fetches the HotUKDeals "hot" RSS feed over plain HTTP and returns its deals as field dicts.
+    Returns an empty list if the feed is unavailable (e.g. challenged), so callers can fall back to the browser.
+    An unchanged feed (304) is answered from the cached copy, so its deals still go through dedupe.
+    """
+    validators, cached_body = load_feed_cache()
+    headers = {"User-Agent": USER_AGENT}
+    if cached_body is not None:
+        headers.update(validators)
+    try:
+        response = SESSION.get(HOTUKDEALS_FEED_URL, headers=headers, timeout=15)
+        if response.status_code == 304 and cached_body is not None:
+            logger.info("HotUKDeals: RSS feed unchanged since the last run; using the cached copy.")
+            try:
+                root = etree.fromstring(cached_body)
+            except etree.XMLSyntaxError:
+                # Otherwise the damaged copy would be revalidated as "unchanged" on every run.
+                clear_feed_cache()
+                raise
+        else:
+            response.raise_for_status()
+            root = etree.fromstring(response.content)
+            save_feed_cache(response)
+    except (requests.exceptions.RequestException, etree.XMLSyntaxError) as e:
+        logger.warning("HotUKDeals: RSS feed unavailable (%s). Falling back to Playwright.", e)
+        return []
+
+    deals = [
+        {
+            "title": (item.findtext("title") or "").strip(),
+            "link": (item.findtext("link") or "").strip(),
+            "price": FEED_PRICE(item).strip(),
+            "heat": "",
+            "image_url": FEED_IMAGE(item).strip(),
+        }
+        for item in FEED_ITEMS(root)
     ]
+    # If the feed format drifts and nothing usable comes back, let the browser path take over.
+    deals = [deal for deal in deals if deal["title"] and deal["link"] and deal["price"]]
+    if not deals:
+        logger.warning("HotUKDeals: RSS feed had no complete deals. Falling back to Playwright.")
+    return deals
+
+# --- Browser profile ---
+# Chromium marks a profile as in use with these files. A killed run leaves them behind, and
+# Chromium then refuses the profile because the lock names another host (every container differs).
+PROFILE_LOCK_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie")
+
+def launch_browser_context(p):
+    """
+    Opens the persistent Chromium profile, clearing lock files a killed run left behind (only one
+    scraper runs at a time, so any lock found here is stale). If the profile still cannot be
+    opened, falls back to a throwaway context so the run goes ahead without it.
+    """
+    for name in PROFILE_LOCK_FILES:
+        try:
+            os.remove(os.path.join(BROWSER_PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
 
-    IMAGE_SELECTORS = [
-        '.thread-image',                         # Original
-        '.deal-image img',                       # Common structure: img inside a container
-        'img[class*="product-image"]',           # Image with "product-image" in class
-        'img[class*="deal-thumbnail"]',          # Image with "deal-thumbnail" in class
-    ]
-    # --- End selector lists ---
+    identity = {"user_agent": USER_AGENT, "viewport": VIEWPORT}
+    try:
+        return p.chromium.launch_persistent_context(BROWSER_PROFILE_DIR, headless=True, **identity)
+    except PlaywrightError as e:
+        logger.warning("Could not open the browser profile at %s (%s). Using a fresh context for this run.", BROWSER_PROFILE_DIR, e)
+        return p.chromium.launch(headless=True).new_context(**identity)
 
+# --- Scraper for HotUKDeals.com with basic Playwright and backup selectors ---
+def scrape_hotukdeals_pages(max_pages, handle_deal):
+    """Scrapes hotukdeals.com deal cards with Playwright (backup selectors and scrolling), passing each card's fields to handle_deal."""
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080}
-        )
-        page = context.new_page()
+        context = launch_browser_context(p)
+        context.route("**/*", block_unneeded_requests)
+        page = context.pages[0] if context.pages else context.new_page()
         
         page_num = 1
-        current_url = base_url
+        current_url = HOTUKDEALS_URL
+        navigate = True # False after 'Load More', which appends cards to the page already open
 
-        SCROLL_ATTEMPTS_PER_PAGE = 3 
-        
         while page_num <= max_pages: 
-            print(f"Scraping HotUKDeals page {page_num} from {current_url} using Playwright (Basic with backup selectors and scrolling)...")
+            logger.info("Scraping HotUKDeals page %d from %s using Playwright (Basic with backup selectors and scrolling)...", page_num, current_url)
             try:
-                page.goto(current_url, wait_until="networkidle", timeout=90000)
-                
-                combined_main_selector = ', '.join(MAIN_DEAL_CONTAINER_SELECTORS)
-                try:
-                    page.wait_for_selector(combined_main_selector, timeout=30000) 
-                    print("HotUKDeals: Successfully waited for a deal card element (using backup selectors).")
-                except Exception as e:
-                    print(f"HotUKDeals: Did not find expected deal content after navigation (all backup selectors failed?). Error: {e}")
-                    print(f"HotUKDeals: Current HTML content (first 1000 chars):\n{page.content()[:1000]}...")
-                    break 
+                if navigate:
+                    # The deal cards are the real readiness signal; waiting for network idle
+                    # stalls on ads/analytics long after the cards have rendered.
+                    goto_with_retry(page, current_url, wait_until="domcontentloaded", timeout=30000)
+
+                    try:
+                        page.wait_for_selector(MAIN_DEAL_CONTAINER_UNION, state="attached", timeout=20000)
+                        logger.info("HotUKDeals: Successfully waited for a deal card element (using backup selectors).")
+                    except Exception as e:
+                        logger.warning("HotUKDeals: Did not find expected deal content after navigation (all backup selectors failed?). Error: %s", e)
+                        logger.warning("HotUKDeals: Current HTML content (first 1000 chars):\n%s...", page.content()[:1000])
+                        break 
 
                 # --- Scrolling Logic ---
-                print(f"HotUKDeals: Attempting to scroll down {SCROLL_ATTEMPTS_PER_PAGE} times to load more deals.")
-                for i in range(SCROLL_ATTEMPTS_PER_PAGE):
-                    print(f"  Scrolling attempt {i+1} of {SCROLL_ATTEMPTS_PER_PAGE}...")
-                    page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    time.sleep(random.uniform(2, 4))
-                    page.wait_for_load_state('networkidle', timeout=10000) 
-                print("HotUKDeals: Finished scrolling attempts.")
+                logger.info("HotUKDeals: Scrolling (up to %d times) until no more deals load.", SCROLL_ATTEMPTS_PER_PAGE)
+                card_count = scroll_until_stable(page)
+                logger.info("HotUKDeals: Finished scrolling with %d deal card matches.", card_count)
                 # --- End Scrolling Logic ---
 
-                html_content = page.content()
-                soup = BeautifulSoup(html_content, 'lxml')
-
-                products = []
-                for selector in MAIN_DEAL_CONTAINER_SELECTORS:
-                    found_products = soup.select(selector)
-                    if found_products:
-                        products.extend(found_products)
-                        break
-
-                if not products:
-                    print("HotUKDeals: No products found with any of the current main selectors (even after scrolling).")
-                    print(f"HotUKDeals: HTML content received (first 2000 chars for debugging):\n{html_content[:2000]}...")
+                deals = extract_deal_cards(page)
+                if not deals:
+                    logger.warning("HotUKDeals: No products found with any of the current main selectors (even after scrolling).")
+                    logger.warning("HotUKDeals: HTML content received (first 2000 chars for debugging):\n%s...", page.content()[:2000])
                     break
 
-                for product in products:
-                    title = find_text_with_multiple_selectors(product, TITLE_SELECTORS)
-                    link_element = find_element_with_multiple_selectors(product, TITLE_SELECTORS)
-                    link = link_element.get('href').strip() if link_element else "N/A"
-                    
-                    price = find_text_with_multiple_selectors(product, PRICE_SELECTORS)
-                    heat = find_text_with_multiple_selectors(product, HEAT_SELECTORS)
-                    image_url = find_text_with_multiple_selectors(product, IMAGE_SELECTORS, attribute='src')
-                    discount_info = "N/A"
-
-                    if title != "N/A" and link != "N/A" and price != "N/A":
-                        deal_item = {
-                            "title": title,
-                            "price": price,
-                            "link": link,
-                            "image_url": image_url,
-                            "metric_info": f"🔥 {heat} Heat",
-                            "discount_info": discount_info
-                        }
-                        
-                        # --- Deduplication: Check if deal has already been sent ---
-                        if deal_item['link'] not in sent_deal_links:
-                            send_to_discord(deal_item, source_name="HotUKDeals")
-                            sent_deal_links.add(deal_item['link']) # Add to set of sent deals
-                            new_deals_sent.append(deal_item) # Keep track of new deals for logging
-                        else:
-                            print(f"Skipped already sent deal: {deal_item['title']}")
-                    else:
-                        print(f"HotUKDeals: Skipped incomplete deal (potential selector issue). Title: '{title}', Link: '{link}', Price: '{price}'")
+                for deal_item in deals:
+                    handle_deal(deal_item)
 
                 # --- Pagination Logic ---
                 next_button_selector = 'li.pagination-next a'
                 load_more_selector = 'a.cept-load-more'
 
                 if page_num < max_pages:
-                    if page.is_visible(load_more_selector, timeout=5000): 
-                        print("HotUKDeals: Clicking 'Load More' button...")
-                        page.click(load_more_selector)
-                        page.wait_for_load_state('networkidle', timeout=30000) 
-                        current_url = page.url 
+                    # is_visible() answers immediately from the current DOM (its timeout argument is
+                    # ignored), so both buttons are checked without polling.
+                    load_more = page.locator(load_more_selector).first
+                    next_button = page.locator(next_button_selector).first
+                    # get_attribute() would wait for a missing element, so only read a visible link.
+                    next_href = next_button.get_attribute("href") if next_button.is_visible() else None
+                    if load_more.is_visible():
+                        logger.info("HotUKDeals: Clicking 'Load More' button...")
+                        # The earlier cards stay attached, so wait for the count to grow, not for any card.
+                        card_count = page.evaluate(CARD_COUNT_JS, MAIN_DEAL_CONTAINER_UNION)
+                        load_more.click()
+                        try:
+                            page.wait_for_function(CARDS_GREW_JS, arg=[MAIN_DEAL_CONTAINER_UNION, card_count], timeout=30000)
+                        except PlaywrightTimeoutError:
+                            logger.info("HotUKDeals: 'Load More' added no deals. Stopping pagination.")
+                            break
+                        # The new cards were added in place; navigating again would reload the first page and drop them.
+                        navigate = False
                         page_num += 1
-                    elif page.is_visible(next_button_selector, timeout=5000): 
-                        print("HotUKDeals: Clicking next page link...")
-                        page.click(next_button_selector)
-                        page.wait_for_load_state('domcontentloaded', timeout=30000)
-                        current_url = page.url 
+                    elif next_href:
+                        logger.info("HotUKDeals: Following next page link...")
+                        # Navigate to the link target on the next pass. Waiting after a click could be
+                        # satisfied by the old page's cards before the navigation even starts.
+                        current_url = urljoin(page.url, next_href)
+                        navigate = True
                         page_num += 1
                     else:
-                        print("HotUKDeals: No more pages or load more button found. Stopping pagination.")
+                        logger.info("HotUKDeals: No more pages or load more button found. Stopping pagination.")
                         break
                 else:
-                    print("HotUKDeals: Max pages reached. Stopping pagination.")
+                    logger.info("HotUKDeals: Max pages reached. Stopping pagination.")
                     break
 
             except Exception as e:
-                print(f"Error during Playwright scraping for HotUKDeals: {e}")
-                import traceback
-                traceback.print_exc() 
+                logger.exception("Error during Playwright scraping for HotUKDeals: %s", e)
                 break
         
-        browser.close()
-    
-    # --- Deduplication: Save updated list of sent deals ---
-    save_sent_deals(SENT_DEALS_FILE, sent_deal_links)
+        context.close()
 
-    return new_deals_sent # Return only newly sent deals for clearer count
+def scrape_hotukdeals(max_pages=1):
+    """
+    Scrapes hotukdeals.com for popular deals, preferring the RSS feed and falling back to Playwright.
+    Deals are streamed straight to Discord as they are found; returns how many new deals Discord accepted.
+    """
+    # --- Deduplication: Load previously sent deals ---
+    sent_deal_keys = load_sent_deals(SENT_DEALS_FILE)
+    # Keys queued for Discord in this run. They only join sent_deal_keys once Discord confirms
+    # them, so a failed post is retried on the next run instead of being suppressed.
+    queued_keys = set()
+
+    # Discord posts run on a single background worker so scrolling/parsing never
+    # waits on webhook round-trips; one worker keeps posts ordered and rate-limit friendly.
+    # The batcher is only ever touched from that worker.
+    discord_pool = ThreadPoolExecutor(max_workers=1)
+    batcher = DiscordBatcher(source_name="HotUKDeals")
+
+    def submit(fn, *args):
+        """Runs fn on the Discord worker, logging any exception it raises."""
+        discord_pool.submit(fn, *args).add_done_callback(log_task_failure)
+
+    def handle_deal(deal_item):
+        """Queues a scraped deal for Discord unless it is incomplete, already queued or was already sent."""
+        if not (deal_item["title"] and deal_item["link"] and deal_item["price"]):
+            logger.debug("HotUKDeals: Skipped incomplete deal (potential selector issue). Title: '%s', Link: '%s', Price: '%s'", deal_item["title"], deal_item["link"], deal_item["price"])
+            return
+
+        # The extracted fields dict doubles as the deal record; no second copy is built.
+        # Card markup may carry relative or protocol-relative URLs; Discord needs absolute ones.
+        deal_item["link"] = urljoin(HOTUKDEALS_URL, deal_item["link"])
+        if deal_item["image_url"]:
+            deal_item["image_url"] = urljoin(HOTUKDEALS_URL, deal_item["image_url"])
+        deal_item["price"] = first_match(PRICE_RE, deal_item["price"])
+        heat = first_match(HEAT_RE, deal_item.pop("heat"))
+        deal_item["metric_info"] = f"🔥 {heat} Heat" if heat else ""
+        
+        # --- Deduplication: Check if deal has already been sent ---
+        key = deal_key(deal_item['link'])
+        if key in sent_deal_keys:
+            sent_deal_keys[key] = time.time() # Still listed: keep remembering it
+            logger.debug("Skipped already sent deal: %s", deal_item["title"])
+        elif key in queued_keys:
+            logger.debug("Skipped deal already queued in this run: %s", deal_item["title"])
+        else:
+            queued_keys.add(key)
+            submit(batcher.add, deal_item, key)
+
+    try:
+        # The RSS feed needs no browser or Cloudflare challenge; Playwright is only the fallback.
+        feed_deals = fetch_hotukdeals_feed()
+        if feed_deals:
+            logger.info("HotUKDeals: Got %d deals from the RSS feed.", len(feed_deals))
+            for deal_item in feed_deals:
+                handle_deal(deal_item)
+        else:
+            scrape_hotukdeals_pages(max_pages, handle_deal)
+    finally:
+        # Even if scraping fails part-way, send the final partial batch, wait for queued Discord
+        # posts and persist what was sent, so those deals are not posted again next run.
+        submit(batcher.flush)
+        discord_pool.shutdown(wait=True)
+
+        # --- Deduplication: Save updated list of sent deals ---
+        # Only deals Discord confirmed are remembered; the worker is done, so its results are safe to read.
+        sent_deal_keys.update(batcher.sent)
+        save_sent_deals(SENT_DEALS_FILE, sent_deal_keys)
+
+    return len(batcher.sent)
 
 if __name__ == "__main__":
-    print("Starting deal scraping from HotUKDeals...")
+    logger.info("Starting deal scraping from HotUKDeals...")
     
-    print("\n--- Scraping HotUKDeals ---")
-    newly_sent_deals = scrape_hotukdeals(max_pages=1) 
+    logger.info("--- Scraping HotUKDeals ---")
+    total_new_deals_sent = scrape_hotukdeals(max_pages=1)
 
-    total_new_deals_sent = len(newly_sent_deals)
     if total_new_deals_sent == 0:
-        print("No new deals found and sent to Discord in this run.")
+        logger.info("No new deals found and sent to Discord in this run.")
     else:
-        print(f"\nScraping complete. Found and sent {total_new_deals_sent} NEW deals from HotUKDeals.")
+        logger.info("Scraping complete. Found and sent %d NEW deals from HotUKDeals.", total_new_deals_sent)
+
+    SESSION.close()
 
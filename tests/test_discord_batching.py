@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import orjson
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper
+
+
+def make_deal(title, price="£1"):
+    return {
+        "title": title,
+        "link": f"https://www.hotukdeals.com/deals/{title}",
+        "price": price,
+        "image_url": "",
+        "metric_info": "",
+        "discount_info": "N/A",
+    }
+
+
+def make_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = "https://discord.test/webhook"
+    return response
+
+
+def posted_titles(post_kwargs):
+    """Returns the embed titles of one SESSION.post call."""
+    return [embed["title"] for embed in orjson.loads(post_kwargs["data"])["embeds"]]
+
+
+class DiscordBatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(scraper, "DISCORD_WEBHOOK_URL", "https://discord.test/webhook"),
+            mock.patch.object(scraper.time, "sleep"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def flush(self, post, titles):
+        batcher = scraper.DiscordBatcher(source_name="HotUKDeals")
+        with mock.patch.object(scraper.SESSION, "post", side_effect=post) as session_post:
+            for title in titles:
+                batcher.add(make_deal(title), title)
+            batcher.flush()
+        return batcher, session_post
+
+    def test_accepted_batch_records_every_key(self):
+        batcher, session_post = self.flush(lambda *args, **kwargs: make_response(204), ["a", "b", "c"])
+        self.assertEqual(session_post.call_count, 1)
+        self.assertEqual(set(batcher.sent), {"a", "b", "c"})
+
+    def test_rejected_batch_is_resent_one_by_one(self):
+        def post(*args, **kwargs):
+            return make_response(400 if "bad" in posted_titles(kwargs) else 204)
+
+        batcher, session_post = self.flush(post, ["a", "bad", "c"])
+        self.assertEqual(session_post.call_count, 4)
+        self.assertEqual([posted_titles(call.kwargs) for call in session_post.call_args_list[1:]], [["a"], ["bad"], ["c"]])
+        self.assertEqual(set(batcher.sent), {"a", "c"})
+
+    def test_connection_failure_records_nothing(self):
+        batcher, session_post = self.flush(mock.Mock(side_effect=requests.exceptions.ConnectionError()), ["a", "b"])
+        self.assertEqual(session_post.call_count, 1)
+        self.assertEqual(batcher.sent, {})
+
+    def test_embed_text_is_clamped_to_discord_limits(self):
+        embed = scraper.build_embed(make_deal("t" * 300, price="p" * 2000), "HotUKDeals")
+        self.assertEqual(len(embed["title"]), scraper.EMBED_TITLE_LIMIT)
+        price = next(field for field in embed["fields"] if field["name"] == "Price")
+        self.assertEqual(len(price["value"]), scraper.EMBED_FIELD_VALUE_LIMIT)
+
+
+if __name__ == "__main__":
+    unittest.main()